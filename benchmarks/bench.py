@@ -0,0 +1,505 @@
+"""Benchmark and load-test harness for the analysis endpoints.
+
+Generates synthetic CSV/XLSX datasets, drives the app through the Flask test
+client (uploads, chat commands, paging, auto_analyze and a stubbed AI call) and
+records latency percentiles, throughput and per-scenario RSS growth. Results are written to JSON so
+runs can be compared for regressions.
+
+Examples:
+    python benchmarks/bench.py                                # default matrix
+    python benchmarks/bench.py --rows 1000,1000000 --shapes narrow --kinds numeric
+    python benchmarks/bench.py --load-users 8 --load-seconds 20
+    python benchmarks/bench.py --output new.json --compare old.json --threshold 1.25
+
+Everything runs in a temporary working directory with its own SQLite database,
+so the repository's uploads/, cache/ and instance/project.db are never touched.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Column layouts. "wide" repeats the base columns until it reaches WIDE_COLUMNS.
+WIDE_COLUMNS = 60
+ARABIC_WORDS = ['ميزانية', 'الرياض', 'القاهرة', 'مبيعات', 'تسويق', 'موارد بشرية', 'مشروع', 'تقرير شهري']
+LATIN_WORDS = ['budget', 'sales', 'marketing', 'operations', 'north', 'south', 'project', 'monthly report']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', default='1000,10000,100000',
+                        help='comma-separated row counts (1K to 10M supported)')
+    parser.add_argument('--shapes', default='narrow,wide', help='narrow and/or wide')
+    parser.add_argument('--kinds', default='numeric,string', help='numeric and/or string (string includes Arabic text)')
+    parser.add_argument('--formats', default='csv,xlsx', help='csv and/or xlsx')
+    parser.add_argument('--max-xlsx-rows', type=int, default=20000,
+                        help='skip XLSX datasets above this many rows (writing them is slow)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed repetitions per scenario')
+    parser.add_argument('--load-users', type=int, default=0,
+                        help='concurrent users for the mixed load test (0 skips it)')
+    parser.add_argument('--load-seconds', type=float, default=10.0, help='duration of the load test')
+    parser.add_argument('--keep-limits', action='store_true',
+                        help='keep the per-user resource limits (disabled by default so they do not skew timings)')
+    parser.add_argument('--warm-caches', action='store_true',
+                        help='keep the frame/derived caches and repeat identical uploads between repeats '
+                             '(by default they are cleared so every repeat measures the real work)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for dataset generation')
+    parser.add_argument('--data-dir', help='reuse generated datasets from this directory')
+    parser.add_argument('--output', default='bench_results.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='flag a regression when p50 or p95 grows by more than this factor')
+    return parser.parse_args(argv)
+
+
+# ============================================================================
+# DATASET GENERATION
+# ============================================================================
+
+def dataset_name(rows, shape, kind, fmt):
+    return f'{shape}-{kind}-{rows}.{fmt}'
+
+
+def make_chunk(rng, start, rows, shape, kind):
+    """Build rows [start, start + rows) of a synthetic dataset"""
+    import numpy as np
+    import pandas as pd
+    cols = {
+        'id': np.arange(start, start + rows),
+        'amount': rng.normal(1000, 250, rows).round(2),
+        'quantity': rng.integers(1, 100, rows),
+    }
+    if kind == 'string':
+        words = np.array(ARABIC_WORDS + LATIN_WORDS, dtype=object)
+        cols['department'] = rng.choice(words, rows)
+        cols['city'] = rng.choice(np.array(ARABIC_WORDS[1:3] + ['Dubai', 'London'], dtype=object), rows)
+        cols['notes'] = [f'{a} {b} #{n}' for a, b, n in zip(rng.choice(words, rows), rng.choice(words, rows),
+                                                              rng.integers(0, 10000, rows))]
+    else:
+        cols['price'] = rng.uniform(1, 500, rows).round(2)
+        cols['discount'] = rng.uniform(0, 0.3, rows).round(3)
+        cols['score'] = rng.normal(0, 1, rows)
+    df = pd.DataFrame(cols)
+    if shape == 'wide':
+        base = [c for c in df.columns if c != 'id']
+        i = 0
+        while df.shape[1] < WIDE_COLUMNS:
+            src = base[i % len(base)]
+            df[f'{src}_{i // len(base) + 1}'] = df[src]
+            i += 1
+    return df
+
+
+def generate_dataset(path, rows, shape, kind, seed, chunk_rows=200_000):
+    """Write a dataset to path, in chunks so 10M-row files do not need 10M rows in memory"""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    if path.endswith('.xlsx'):
+        make_chunk(rng, 0, rows, shape, kind).to_excel(path, index=False)
+        return
+    header = True
+    for start in range(0, rows, chunk_rows):
+        chunk = make_chunk(rng, start, min(chunk_rows, rows - start), shape, kind)
+        chunk.to_csv(path, mode='w' if header else 'a', header=header, index=False, encoding='utf-8')
+        header = False
+    if rows == 0:
+        pd.DataFrame(columns=make_chunk(rng, 0, 1, shape, kind).columns).to_csv(path, index=False)
+
+
+def build_matrix(args):
+    rows = [int(r.replace('_', '')) for r in args.rows.split(',') if r.strip()]
+    matrix = []
+    for n in rows:
+        for shape in args.shapes.split(','):
+            for kind in args.kinds.split(','):
+                for fmt in args.formats.split(','):
+                    if fmt == 'xlsx' and n > args.max_xlsx_rows:
+                        continue
+                    matrix.append((n, shape.strip(), kind.strip(), fmt.strip()))
+    return matrix
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def process_peak_rss_mb():
+    """High-water mark of the whole benchmark process (only ever grows).
+    None where the `resource` module is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def current_rss_mb():
+    """Current RSS from /proc/self/statm. Linux only: None elsewhere, so the
+    per-scenario rss_* fields are null on Windows and macOS."""
+    try:
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class RssSampler:
+    """Samples current RSS in a background thread while a scenario runs"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start_mb = self.end_mb = self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+                self.peak_mb = rss
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.end_mb = current_rss_mb()
+        if self.end_mb is not None and (self.peak_mb is None or self.end_mb > self.peak_mb):
+            self.peak_mb = self.end_mb
+
+    def stats(self):
+        def mb(value):
+            return round(value, 1) if value is not None else None
+        delta = self.peak_mb - self.start_mb if self.start_mb is not None and self.peak_mb is not None else None
+        return {
+            'rss_start_mb': mb(self.start_mb),
+            'rss_end_mb': mb(self.end_mb),
+            'rss_peak_mb': mb(self.peak_mb),        # highest RSS seen during this scenario
+            'rss_peak_delta_mb': mb(delta),         # how much this scenario grew RSS above its start
+            'process_peak_rss_mb': process_peak_rss_mb(),
+        }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies_ms, wall_seconds, errors, sampler):
+    values = sorted(latencies_ms)
+    stats = {
+        'n': len(values),
+        'errors': errors,
+        'mean_ms': round(sum(values) / len(values), 2) if values else None,
+        'throughput_rps': round(len(values) / wall_seconds, 2) if wall_seconds > 0 else None,
+    }
+    stats.update(sampler.stats())
+    for pct in (50, 90, 95, 99):
+        value = percentile(values, pct)
+        stats[f'p{pct}_ms'] = round(value, 2) if value is not None else None
+    stats['max_ms'] = round(values[-1], 2) if values else None
+    return stats
+
+
+def is_error(response):
+    if response.status_code >= 400:
+        return True
+    data = response.get_json(silent=True)
+    if isinstance(data, dict):
+        text = str(data.get('response') or data.get('answer') or '')
+        return bool(data.get('error')) or text.startswith(('Error', 'Failed', 'No cached'))
+    return not response.data or b'error' in response.data.lower()
+
+
+def timed(fn, repeat, reset=None):
+    """Run fn repeat+1 times; the first call is also reported separately as cold_ms.
+    `reset` runs (untimed) before every call, e.g. to drop the content-hash caches
+    so each repeat does the real work instead of hitting a cache.
+    """
+    with RssSampler() as sampler:
+        if reset:
+            reset()
+        cold_start = time.perf_counter()
+        errors = int(is_error(fn()))
+        cold_ms = (time.perf_counter() - cold_start) * 1000
+        latencies = []
+        work_seconds = 0.0
+        for _ in range(repeat):
+            if reset:
+                reset()
+            start = time.perf_counter()
+            errors += int(is_error(fn()))
+            elapsed = time.perf_counter() - start
+            work_seconds += elapsed
+            latencies.append(elapsed * 1000)
+    stats = summarize(latencies, work_seconds, errors, sampler)
+    stats['cold_ms'] = round(cold_ms, 2)
+    return stats
+
+
+# ============================================================================
+# APP DRIVER
+# ============================================================================
+
+class _StubCompletions:
+    def create(self, **kwargs):
+        from types import SimpleNamespace
+        message = SimpleNamespace(content='Stubbed answer for benchmarking.')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class _StubOpenAI:
+    """Stands in for the OpenAI client so AI requests measure only our own overhead"""
+    def __init__(self):
+        from types import SimpleNamespace
+        self.chat = SimpleNamespace(completions=_StubCompletions())
+
+
+def load_app(workdir, keep_limits):
+    """Import main inside an isolated working directory with its own database"""
+    os.chdir(workdir)
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "bench.db")}'
+    os.environ.setdefault('OPENAI_API_KEY', 'sk-bench-stub')
+    if not keep_limits:
+        os.environ.setdefault('ANALYST_MAX_ROWS', '0')
+        os.environ.setdefault('ANALYST_MAX_BYTES', '0')
+        os.environ.setdefault('ANALYST_CPU_SECONDS_PER_WINDOW', '1e12')
+        os.environ.setdefault('ANALYST_MAX_CONCURRENT_PER_USER', '1000')
+        os.environ.setdefault('ANALYST_MAX_CONCURRENT_TOTAL', '1000')
+    sys.path.insert(0, REPO_ROOT)
+    import main
+    main.create_openai_client = lambda: _StubOpenAI()
+    main.init_db()
+    return main
+
+
+def login_client(main, username):
+    client = main.app.test_client()
+    client.post('/register', data={'username': username, 'password': 'bench-pass', 'password_confirm': 'bench-pass'})
+    client.post('/login', data={'username': username, 'password': 'bench-pass'})
+    return client
+
+
+def upload(client, path, filename=None):
+    with open(path, 'rb') as fh:
+        return client.post('/upload', data={'file': (fh, filename or os.path.basename(path))},
+                           content_type='multipart/form-data')
+
+
+def chat(client, message):
+    return client.post('/chat', json={'message': message})
+
+
+def bust_content_caches(main):
+    """Drop the parsed-frame and derived caches keyed by content hash"""
+    for folder in (main.FRAME_CACHE_FOLDER, main.DERIVED_CACHE_FOLDER):
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def reset_ai_quota(main, username):
+    """Zero the user's AI query count so repeats time the AI path, not the quota rejection"""
+    with main.app.app_context():
+        user = main.User.query.filter_by(username=username).one()
+        user.ai_query_count = 0
+        main.db.session.commit()
+
+
+def bench_dataset(main, path, repeat, user_index, warm_caches=False):
+    """Time every scenario for one dataset; returns {scenario: stats}.
+    Unless warm_caches is set, every call starts from empty content-hash caches
+    and every upload stores a new blob, so the timings measure the real work.
+    """
+    username = f'bench-user-{user_index}'
+    client = login_client(main, username)
+    filename = os.path.basename(path)
+    reset = None if warm_caches else (lambda: bust_content_caches(main))
+    results = {}
+
+    # Upload under a fresh name each time, with the blobs removed beforehand (untimed), so no
+    # repeat takes the "already up to date" or existing-blob shortcut. The last call uses the real name.
+    names = iter([f'r{i}-{filename}' for i in range(repeat)] + [filename])
+    if warm_caches:
+        results['upload'] = timed(lambda: upload(client, path), repeat)
+    else:
+        results['upload'] = timed(lambda: upload(client, path, next(names)), repeat,
+                                  lambda: shutil.rmtree(main.BLOB_FOLDER, ignore_errors=True))
+    results['select_file'] = timed(lambda: client.post('/select_file', json={'filename': filename}), repeat)
+    for command in ('show head', 'show shape', 'describe data', 'show me the average', 'show all data'):
+        results[f'chat:{command}'] = timed(lambda c=command: chat(client, c), repeat, reset)
+    results['chat:show page 2'] = timed(lambda: chat(client, 'show page 2'), repeat)
+    results['chat:plot amount'] = timed(lambda: chat(client, 'plot amount'), repeat, reset)
+    results['auto_analyze'] = timed(lambda: client.post('/api/v1/auto_analyze', json={'filename': filename}),
+                                    repeat, reset)
+
+    def reset_ai():
+        reset_ai_quota(main, username)
+        if reset:
+            reset()
+
+    results['chat:ai question'] = timed(lambda: chat(client, 'which department has the highest amount?'),
+                                        repeat, reset_ai)
+    return results
+
+
+LOAD_MIX = ['show head', 'describe data', 'show me the average', 'show all data', 'show page 2', 'plot amount']
+
+
+def run_load_test(main, path, users, seconds):
+    """Mixed workload from `users` concurrent clients against one dataset"""
+    filename = os.path.basename(path)
+    clients = []
+    for i in range(users):
+        client = login_client(main, f'load-user-{i}')
+        upload(client, path)
+        client.post('/select_file', json={'filename': filename})
+        clients.append(client)
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(client, offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            failed = is_error(chat(client, LOAD_MIX[i % len(LOAD_MIX)]))
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += int(failed)
+            i += 1
+
+    threads = [threading.Thread(target=worker, args=(c, i)) for i, c in enumerate(clients)]
+    wall_start = time.perf_counter()
+    with RssSampler() as sampler:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    stats = summarize(latencies, time.perf_counter() - wall_start, errors[0], sampler)
+    stats['users'] = users
+    return stats
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare_results(current, baseline, threshold):
+    """Return a list of regression descriptions (p50/p95/cold grown by more than threshold)"""
+    base = {(r['dataset'], r['scenario']): r for r in baseline.get('results', [])}
+    regressions = []
+    for row in current['results']:
+        old = base.get((row['dataset'], row['scenario']))
+        if not old:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'cold_ms'):
+            before, after = old.get(metric), row.get(metric)
+            # Ignore sub-millisecond noise
+            if before and after and after > 1 and after / before > threshold:
+                regressions.append(f'{row["dataset"]} {row["scenario"]} {metric}: '
+                                   f'{before:.1f} -> {after:.1f} ms ({after / before:.2f}x)')
+    return regressions
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    args.output = os.path.abspath(args.output)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    workdir = tempfile.mkdtemp(prefix='analyst-bench-')
+    data_dir = os.path.abspath(args.data_dir) if args.data_dir else os.path.join(workdir, 'datasets')
+    os.makedirs(data_dir, exist_ok=True)
+
+    started = datetime.now(timezone.utc).isoformat()
+    import_start = time.perf_counter()
+    main = load_app(workdir, args.keep_limits)
+    import_ms = (time.perf_counter() - import_start) * 1000
+
+    results = []
+    try:
+        matrix = build_matrix(args)
+        for index, (rows, shape, kind, fmt) in enumerate(matrix):
+            path = os.path.join(data_dir, dataset_name(rows, shape, kind, fmt))
+            if not os.path.exists(path):
+                print(f'generating {os.path.basename(path)} ...', flush=True)
+                generate_dataset(path, rows, shape, kind, args.seed)
+            print(f'benchmarking {os.path.basename(path)} ({os.path.getsize(path) / 1e6:.1f} MB)', flush=True)
+            for scenario, stats in bench_dataset(main, path, args.repeat, index, args.warm_caches).items():
+                results.append(dict(stats, dataset=os.path.basename(path), rows=rows, shape=shape,
+                                    kind=kind, format=fmt, scenario=scenario))
+                # RSS is sampled from /proc, so it is only reported on Linux
+                rss = ('' if stats['rss_peak_delta_mb'] is None else
+                       f'  rss +{stats["rss_peak_delta_mb"]} MB (process peak {stats["process_peak_rss_mb"]} MB)')
+                print(f'  {scenario:<28} p50 {stats["p50_ms"]:>9} ms  p95 {stats["p95_ms"]:>9} ms  '
+                      f'cold {stats["cold_ms"]:>9} ms{rss}', flush=True)
+        if args.load_users and matrix:
+            rows, shape, kind, fmt = matrix[0]
+            path = os.path.join(data_dir, dataset_name(rows, shape, kind, fmt))
+            print(f'load test: {args.load_users} users for {args.load_seconds}s on {os.path.basename(path)}', flush=True)
+            stats = run_load_test(main, path, args.load_users, args.load_seconds)
+            results.append(dict(stats, dataset=os.path.basename(path), rows=rows, shape=shape,
+                                kind=kind, format=fmt, scenario='load:mixed'))
+            print(f'  throughput {stats["throughput_rps"]} req/s, p95 {stats["p95_ms"]} ms', flush=True)
+    finally:
+        os.chdir(REPO_ROOT)
+        # Generated datasets are kept only when --data-dir points outside the work directory
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'started_at': started,
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'import_main_ms': round(import_ms, 2),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
+    print(f'results written to {args.output}')
+
+    if compare_path:
+        with open(compare_path, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        if baseline.get('meta', {}).get('args', {}).get('warm_caches', False) != args.warm_caches:
+            print('warning: baseline and this run differ in --warm-caches; timings are not comparable')
+        regressions = compare_results(report, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s) above {args.threshold}x:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print('no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
@@ -0,0 +1,67 @@
+# Gunicorn configuration (picked up automatically from the working directory,
+# and passed explicitly in the Procfile).
+#
+# Startup strategy:
+# - on_starting() creates/upgrades the database schema once in the master, then closes
+#   the master's pooled connections so no worker inherits a database connection.
+# - preload_app loads main.py once in the master process instead of once per worker.
+# - when_ready() then imports the heavy analysis stack (pandas, plotly, openai)
+#   in the master, before any worker is forked. Workers inherit those modules
+#   copy-on-write, so the first plot/AI request no longer pays the import cost
+#   and the imported code is shared between workers rather than duplicated.
+# - post_fork() logs each worker's RSS right after the fork so the saving can
+#   be compared against a run with ANALYST_PRELOAD=0.
+import os
+
+preload_app = os.environ.get('ANALYST_PRELOAD', '1') != '0'
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+# Threads let one worker hold queued analyses (see main.ResourceGovernor) while still serving
+# other requests. Running plus queued analyses are capped below the thread count, so auth pages
+# and other users always find a free thread.
+_analysis_threads = (int(os.environ.get('ANALYST_MAX_CONCURRENT_TOTAL', '4'))
+                     + int(os.environ.get('ANALYST_MAX_QUEUED_TOTAL', '4')))
+threads = max(int(os.environ.get('GUNICORN_THREADS', '0')), _analysis_threads + 2)
+
+
+def on_starting(server):
+    """Create/upgrade the database once, in the master, before any worker serves requests"""
+    import main
+    main.init_db()
+    # A connection shared across fork() is unsafe (SQLite and PostgreSQL alike)
+    with main.app.app_context():
+        main.db.engine.dispose()
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before workers fork"""
+    if not preload_app:
+        return
+    import main
+    start_rss = main.current_rss_mb()
+    timings = main.warm_up()
+    server.log.info(
+        'Warm-up imports (ms): %s | master RSS %s MB -> %s MB',
+        timings, start_rss, main.current_rss_mb(),
+    )
+
+
+def post_worker_init(worker):
+    """Without preload, warm up inside each worker before it accepts requests"""
+    if preload_app:
+        return
+    import main
+    worker.log.info('Worker %s warm-up imports (ms): %s', worker.pid, main.warm_up())
+
+
+def post_fork(server, worker):
+    """Runs in each worker right after it is forked"""
+    import main
+    # Drop any pooled connection inherited from the master without closing it
+    # under the master's feet; the worker opens its own on first use.
+    with main.app.app_context():
+        main.db.engine.dispose(close=False)
+    try:
+        server.log.info('Worker %s started, RSS %s MB', worker.pid, main.current_rss_mb())
+    except Exception:
+        # Never block a worker from booting just because reporting failed
+        pass
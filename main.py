@@ -14,25 +14,41 @@
 # Finally, return a success message
 
 # Run the web server
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.orm import deferred
 import os
-import pandas as pd
+import io
+import sys
+import json
 import math
+import time
 import uuid
+import importlib
+import itertools
+import threading
+from collections import deque
 from datetime import datetime
 from typing import Optional
 
+# NOTE: pandas, plotly and openai are deliberately NOT imported at module level.
+# The auth pages (login/register) never need them, so they are imported inside
+# the handlers that use them. In production `warm_up()` imports them once in the
+# gunicorn master (see gunicorn.conf.py, preload_app=True) so every forked worker
+# shares the already-imported modules copy-on-write and the in-handler imports
+# become a cheap sys.modules lookup.
+HEAVY_MODULES = ('pandas', 'plotly.graph_objects', 'openai')
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'change-me-for-prod')
 
 # Database configuration
 instance_path = os.path.join(os.path.dirname(__file__), 'instance')
 os.makedirs(instance_path, exist_ok=True)
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(instance_path, "project.db")}'
+# DATABASE_URL (see .env.example) overrides the default SQLite file, e.g. for PostgreSQL or isolated benchmark runs
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or f'sqlite:///{os.path.join(instance_path, "project.db")}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
@@ -43,6 +59,33 @@ UPLOAD_FOLDER = 'uploads'
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Uploads are stored once per unique content as uploads/blobs/<sha256><ext>
+BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, 'blobs')
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Per-session dataset cache used for paging ("show page N")
+CACHE_FOLDER = 'cache'
+# Content-addressed caches shared by every File record pointing at the same blob
+FRAME_CACHE_FOLDER = os.path.join(CACHE_FOLDER, 'frames')
+DERIVED_CACHE_FOLDER = os.path.join(CACHE_FOLDER, 'derived')
+PAGE_SIZE = 50
+
+# Multi-file operations (concat/join/diff) stream files in chunks of this many rows
+# and spill hash partitions to disk, so memory is bounded by one partition pair.
+CHUNK_ROWS = int(os.environ.get('ANALYST_CHUNK_ROWS', '50000'))
+JOIN_PARTITIONS = int(os.environ.get('ANALYST_JOIN_PARTITIONS', '16'))
+
+# Per-user resource limits for data analyses (0 disables a row/byte budget)
+MAX_CONCURRENT_PER_USER = int(os.environ.get('ANALYST_MAX_CONCURRENT_PER_USER', '2'))
+MAX_CONCURRENT_TOTAL = int(os.environ.get('ANALYST_MAX_CONCURRENT_TOTAL', '4'))
+CPU_SECONDS_PER_WINDOW = float(os.environ.get('ANALYST_CPU_SECONDS_PER_WINDOW', '60'))
+CPU_WINDOW_SECONDS = float(os.environ.get('ANALYST_CPU_WINDOW_SECONDS', '300'))
+MAX_ROWS_PER_ANALYSIS = int(os.environ.get('ANALYST_MAX_ROWS', '1000000'))
+MAX_BYTES_PER_ANALYSIS = int(os.environ.get('ANALYST_MAX_BYTES', str(200 * 1024 * 1024)))
+QUEUE_TIMEOUT_SECONDS = float(os.environ.get('ANALYST_QUEUE_TIMEOUT', '30'))
+# Queued requests each hold a server thread, so the queue is capped per user and overall
+MAX_QUEUED_PER_USER = int(os.environ.get('ANALYST_MAX_QUEUED_PER_USER', '2'))
+MAX_QUEUED_TOTAL = int(os.environ.get('ANALYST_MAX_QUEUED_TOTAL', '4'))
 
 # Helper to create OpenAI client in a proxy-safe way
 def create_openai_client():
@@ -79,6 +122,152 @@ def create_openai_client():
             return OpenAI(api_key=api_key)
 
     return OpenAI(api_key=api_key)
+
+
+def warm_up(modules=HEAVY_MODULES):
+    """Import the heavy analysis stack ahead of the first request.
+    Called from the gunicorn master before workers are forked (and usable from
+    any other entry point). Returns a dict of module name -> import time in ms;
+    modules that fail to import are reported as None instead of raising.
+    """
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            if name == 'plotly.graph_objects':
+                # plotly loads its figure/trace classes lazily on first use, so build and
+                # render a tiny figure to pay that cost here rather than in the first request
+                go = sys.modules[name]
+                go.Figure(data=[go.Histogram(x=[0, 1])]).to_html(include_plotlyjs='cdn')
+        except Exception:
+            timings[name] = None
+            continue
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    return timings
+
+
+def current_rss_mb():
+    """Return the resident set size of this process in MB (None if unknown)."""
+    try:
+        # Linux: current RSS from /proc (pages -> bytes)
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except Exception:
+        pass
+    try:
+        import resource
+        # Peak RSS fallback: kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        divisor = 1024 * 1024 if os.uname().sysname == 'Darwin' else 1024
+        return round(peak / divisor, 1)
+    except Exception:
+        return None
+
+
+def load_dataframe(filepath, dtype=None, nrows=None):
+    """Read a CSV/TXT or Excel file into a DataFrame.
+    CSV bytes are decoded as utf-8 (replacing errors) to avoid decode failures;
+    if an Excel read fails the file is retried as CSV. `dtype` is passed to the
+    pandas reader, e.g. {'id': str} to keep key cells as written. With `nrows`
+    only that many data rows are parsed (CSV is then streamed, not read whole).
+    """
+    import pandas as pd
+    if filepath.lower().endswith(('.csv', '.txt')):
+        if nrows is not None:
+            return pd.read_csv(filepath, encoding='utf-8', encoding_errors='replace', dtype=dtype, nrows=nrows)
+        with open(filepath, 'rb') as fh:
+            raw = fh.read()
+        try:
+            text = raw.decode('utf-8')
+        except Exception:
+            text = raw.decode('utf-8', errors='replace')
+        return pd.read_csv(io.StringIO(text), dtype=dtype)
+    try:
+        return pd.read_excel(filepath, dtype=dtype, nrows=nrows)
+    except Exception:
+        # fallback to reading as CSV if excel read fails
+        if nrows is not None:
+            return pd.read_csv(filepath, encoding='utf-8', encoding_errors='replace', dtype=dtype, nrows=nrows)
+        with open(filepath, 'rb') as fh:
+            raw = fh.read()
+        text = raw.decode('utf-8', errors='replace')
+        return pd.read_csv(io.StringIO(text), dtype=dtype)
+
+
+def get_session_id():
+    """Return this browser session's id, creating one if needed"""
+    sid = session.get('sid')
+    if not sid:
+        sid = uuid.uuid4().hex
+        session['sid'] = sid
+    return sid
+
+
+def clear_session_cache(sid):
+    """Remove any cached dataset (pickled frame or CSV result) for a session"""
+    for ext in ('pkl', 'csv'):
+        path = os.path.join(CACHE_FOLDER, f'{sid}.{ext}')
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            pass
+
+
+def cache_session_df(sid, df):
+    """Cache a full dataframe for paging (best-effort)"""
+    import pandas as pd
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    clear_session_cache(sid)
+    try:
+        pd.to_pickle(df, os.path.join(CACHE_FOLDER, f'{sid}.pkl'))
+    except Exception:
+        pass
+
+
+def make_page(df_obj, page_num=1, page_size=PAGE_SIZE, total_rows=None):
+    """Render one page of a dataframe as HTML plus its pagination info.
+    When total_rows is given, df_obj is already the requested page.
+    """
+    if total_rows is None:
+        total_rows = int(df_obj.shape[0])
+    total_pages = max(1, math.ceil(total_rows / page_size))
+    page = max(1, min(page_num, total_pages))
+    if df_obj.shape[0] > page_size:
+        start = (page - 1) * page_size
+        df_obj = df_obj.iloc[start:start + page_size]
+    html = df_obj.to_html(classes='data-table', index=False, border=0)
+    pagination = {'total_pages': total_pages, 'current_page': page, 'page_size': page_size, 'total_rows': total_rows}
+    return html, pagination
+
+
+def load_cached_page(sid, page_num, page_size=PAGE_SIZE):
+    """Return (html, pagination) for a page of the session's cached dataset, or None.
+    Multi-file results are cached as CSV and only the requested rows are read.
+    """
+    import pandas as pd
+    pkl_path = os.path.join(CACHE_FOLDER, f'{sid}.pkl')
+    if os.path.exists(pkl_path):
+        try:
+            return make_page(pd.read_pickle(pkl_path), page_num, page_size)
+        except Exception:
+            return None
+    csv_path = os.path.join(CACHE_FOLDER, f'{sid}.csv')
+    total_rows = session.get('result_rows')
+    if not os.path.exists(csv_path) or total_rows is None:
+        return None
+    total_pages = max(1, math.ceil(total_rows / page_size))
+    page = max(1, min(page_num, total_pages))
+    start = (page - 1) * page_size
+    try:
+        sub = pd.read_csv(csv_path, skiprows=range(1, start + 1), nrows=page_size)
+    except Exception:
+        return None
+    return make_page(sub, page, page_size, total_rows=total_rows)
+
+
 # ============================================================================
 # DATABASE MODELS
 # ============================================================================
@@ -113,9 +302,19 @@ class File(db.Model):
     filename = db.Column(db.String(255), nullable=False)
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Content-addressed storage: each upload of a filename is a new version pointing
+    # at a shared blob. Rows from before versioning have no hash and live at uploads/<filename>.
+    content_hash = db.Column(db.String(64), index=True)
+    size_bytes = db.Column(db.Integer)
+    version = db.Column(db.Integer, default=1)
+    
+    # One row per version: concurrent uploads of the same filename cannot both claim a version number
+    __table_args__ = (
+        db.Index('uq_file_user_filename_version', 'user_id', 'filename', 'version', unique=True),
+    )
     
     def __repr__(self):
-        return f'<File {self.filename}>'
+        return f'<File {self.filename} v{self.version or 1}>'
 
 
 class Dashboard(db.Model):
@@ -151,6 +350,400 @@ def load_user(user_id):
     """Load user by ID for Flask-Login"""
     return User.query.get(int(user_id))
 
+
+def upgrade_schema():
+    """Add columns and indexes introduced after a table was created.
+    db.create_all() never alters existing tables, so older databases would
+    otherwise crash on queries that select the new columns.
+    """
+    from sqlalchemy import inspect, text
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        missing = [c for c in table.columns if c.name not in existing]
+        if missing:
+            with db.engine.begin() as conn:
+                for column in missing:
+                    col_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+        for index in table.indexes:
+            try:
+                with db.engine.begin() as conn:
+                    index.create(bind=conn, checkfirst=True)
+            except Exception as e:
+                # e.g. duplicate versions recorded before the unique index existed
+                app.logger.warning('Could not create index %s: %s', index.name, e)
+
+
+def init_db():
+    """Create missing tables and upgrade older ones in place"""
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+
+
+# ============================================================================
+# FILE STORAGE (content-addressed blobs, per-user versions)
+# ============================================================================
+
+def blob_path(content_hash, filename):
+    """Path of the blob holding `content_hash`; the extension selects the reader"""
+    ext = os.path.splitext(filename)[1].lower()
+    return os.path.join(BLOB_FOLDER, f'{content_hash}{ext}')
+
+
+def stored_file_path(user_file):
+    """Path on disk for a File record (its blob, or uploads/<filename> for legacy rows)"""
+    if user_file.content_hash:
+        return blob_path(user_file.content_hash, user_file.filename)
+    return os.path.join(UPLOAD_FOLDER, user_file.filename)
+
+
+def store_upload(stream, filename):
+    """Stream an upload to the blob store, hashing it on the way.
+    Identical content is kept once: if the blob already exists the new copy is
+    discarded. Returns (content_hash, size_bytes).
+    """
+    import hashlib
+    import tempfile
+    os.makedirs(BLOB_FOLDER, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=BLOB_FOLDER, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        content_hash = digest.hexdigest()
+        target = blob_path(content_hash, filename)
+        if os.path.exists(target):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, target)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return content_hash, size
+
+
+def split_version(name):
+    """Split "report.csv@v2" into ("report.csv", 2); plain names give version None"""
+    base, sep, tag = name.rpartition('@v')
+    if sep and base and tag.isdigit():
+        return base, int(tag)
+    return name, None
+
+
+def get_user_file(filename, version=None, user_id=None):
+    """Return the current user's File record for filename (latest version unless given)"""
+    query = File.query.filter_by(filename=filename, user_id=user_id or current_user.id)
+    if version is not None:
+        if version == 1:
+            # Legacy rows predate versioning and count as version 1
+            query = query.filter((File.version == 1) | (File.version.is_(None)))
+        else:
+            query = query.filter_by(version=version)
+    return query.order_by(File.version.desc(), File.upload_date.desc()).first()
+
+
+def latest_versions(user_files):
+    """Keep only the newest File record per filename"""
+    latest = {}
+    for f in user_files:
+        current = latest.get(f.filename)
+        if current is None or (f.version or 1, f.upload_date) > (current.version or 1, current.upload_date):
+            latest[f.filename] = f
+    return latest
+
+
+def content_cache_key(user_file):
+    """Key for content-derived caches: the blob name (hash plus extension), since
+    the same bytes are parsed differently as .csv and .xlsx"""
+    return os.path.basename(blob_path(user_file.content_hash, user_file.filename))
+
+
+def write_cache_file(path, write):
+    """Write a shared cache file atomically: `write(fh)` fills a temp file in the same
+    directory, which is then renamed into place, so concurrent readers never see a
+    half-written file."""
+    import tempfile
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            write(fh)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_user_dataframe(user_file, max_rows=None):
+    """Load a File record's data, reusing the parsed frame cached for its content.
+    With `max_rows`, at most that many rows are parsed and cached; if the file
+    has more, the frame's attrs['rows_truncated'] is set.
+    """
+    import pandas as pd
+    path = stored_file_path(user_file)
+
+    def read():
+        if not max_rows:
+            return load_dataframe(path)
+        # One extra row tells us whether the file was cut
+        df = load_dataframe(path, nrows=max_rows + 1)
+        if len(df) > max_rows:
+            df = df.iloc[:max_rows]
+            df.attrs['rows_truncated'] = True
+        return df
+
+    if not user_file.content_hash:
+        return read()
+    suffix = f'-rows{max_rows}' if max_rows else ''
+    frame_path = os.path.join(FRAME_CACHE_FOLDER, f'{content_cache_key(user_file)}{suffix}.pkl')
+    if os.path.exists(frame_path):
+        try:
+            return pd.read_pickle(frame_path)
+        except Exception:
+            pass
+    df = read()
+    try:
+        write_cache_file(frame_path, df.to_pickle)
+    except Exception:
+        # best-effort
+        pass
+    return df
+
+
+def cached_derived(user_file, key, compute):
+    """Return a value derived from a file's content (describe table, summaries, ...),
+    computing it once per content hash. Legacy files without a hash are not cached.
+    """
+    import pickle
+    if not user_file.content_hash:
+        return compute()
+    path = os.path.join(DERIVED_CACHE_FOLDER, content_cache_key(user_file), f'{key}.pkl')
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as fh:
+                return pickle.load(fh)
+        except Exception:
+            pass
+    value = compute()
+    try:
+        write_cache_file(path, lambda fh: pickle.dump(value, fh))
+    except Exception:
+        pass
+    return value
+
+# ============================================================================
+# RESOURCE GOVERNANCE (per-user limits and fair-share scheduling)
+# ============================================================================
+
+class AnalysisLimitError(Exception):
+    """Raised when an analysis cannot run within the user's resource limits"""
+
+
+class ResourceGovernor:
+    """Per-user concurrency and CPU-time limits for data analyses.
+    Requests over a limit are queued, not rejected. When a slot frees up it goes
+    to the waiting user with the fewest running analyses, then the least CPU used
+    in the current window, then the longest wait. A waiting request holds a server
+    thread, so the queue is bounded (`max_queued_per_user`, `max_queued_total`)
+    and requests beyond it are rejected at once, as are requests whose CPU budget
+    cannot free up before `queue_timeout`. State is per process, so each gunicorn
+    worker enforces the limits on its own.
+    """
+
+    def __init__(self, max_concurrent_per_user, max_concurrent_total, cpu_seconds_per_window,
+                 window_seconds, queue_timeout, max_rows=0, max_bytes=0,
+                 max_queued_per_user=2, max_queued_total=4):
+        self.max_concurrent_per_user = max_concurrent_per_user
+        self.max_concurrent_total = max_concurrent_total
+        self.max_queued_per_user = max_queued_per_user
+        self.max_queued_total = max_queued_total
+        self.cpu_seconds_per_window = cpu_seconds_per_window
+        self.window_seconds = window_seconds
+        self.queue_timeout = queue_timeout
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._cond = threading.Condition()
+        self._counter = itertools.count()
+        self._total_active = 0
+        self._active = {}   # user_id -> running analyses
+        self._waiting = {}  # user_id -> deque of tickets, FIFO per user
+        self._cpu = {}      # user_id -> deque of (finished_at, cpu_seconds)
+
+    def _cpu_used(self, user_id, now):
+        history = self._cpu.get(user_id)
+        if not history:
+            return 0.0
+        while history and history[0][0] <= now - self.window_seconds:
+            history.popleft()
+        return sum(cpu for _, cpu in history)
+
+    def _cpu_frees_at(self, user_id, now):
+        """When the user's CPU use in the window drops back under budget"""
+        used = self._cpu_used(user_id, now)
+        if used < self.cpu_seconds_per_window:
+            return now
+        for finished_at, cpu in self._cpu.get(user_id, ()):
+            used -= cpu
+            if used < self.cpu_seconds_per_window:
+                return finished_at + self.window_seconds
+        return now
+
+    def _eligible(self, user_id, now):
+        return (self._active.get(user_id, 0) < self.max_concurrent_per_user
+                and self._cpu_used(user_id, now) < self.cpu_seconds_per_window)
+
+    def _next_ticket(self, now):
+        """The ticket that should run next, or None if nothing can run yet"""
+        if self._total_active >= self.max_concurrent_total:
+            return None
+        candidates = [
+            (self._active.get(uid, 0), self._cpu_used(uid, now), queue[0], uid)
+            for uid, queue in self._waiting.items()
+            if queue and self._eligible(uid, now)
+        ]
+        if not candidates:
+            return None
+        return min(candidates)[2]
+
+    def acquire(self, user_id):
+        """Wait until the user may start an analysis; returns a token for release().
+        Raises AnalysisLimitError when the queue is full, when the user's CPU budget
+        cannot free up before the timeout, or when the timeout passes.
+        """
+        ticket = (time.monotonic(), next(self._counter))
+        deadline = ticket[0] + self.queue_timeout
+        with self._cond:
+            queue = self._waiting.setdefault(user_id, deque())
+            queue.append(ticket)
+            if self._next_ticket(ticket[0]) != ticket:
+                user_queued = len(queue) - 1
+                total_queued = sum(len(q) for q in self._waiting.values()) - 1
+                if user_queued >= self.max_queued_per_user or total_queued >= self.max_queued_total:
+                    self._drop(user_id, ticket)
+                    raise AnalysisLimitError('Too many analyses are running or queued right now. Please try again shortly.')
+            while self._next_ticket(time.monotonic()) != ticket:
+                now = time.monotonic()
+                if self._cpu_frees_at(user_id, now) > deadline:
+                    # Waiting cannot help: the budget frees up only after we would give up
+                    self._drop(user_id, ticket)
+                    raise AnalysisLimitError('You have used your CPU time for analyses in this window. Please try again in a few minutes.')
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._drop(user_id, ticket)
+                    raise AnalysisLimitError('Too many analyses are running right now. Please try again shortly.')
+                # Wake up at least once a second: CPU budgets free up as the window slides
+                self._cond.wait(min(remaining, 1.0))
+            queue.popleft()
+            if not queue:
+                del self._waiting[user_id]
+            self._active[user_id] = self._active.get(user_id, 0) + 1
+            self._total_active += 1
+            # Another user's ticket may be next in line if capacity remains
+            self._cond.notify_all()
+        return user_id, time.thread_time()
+
+    def _drop(self, user_id, ticket):
+        """Remove a ticket that gives up waiting (caller holds the lock)"""
+        queue = self._waiting[user_id]
+        queue.remove(ticket)
+        if not queue:
+            del self._waiting[user_id]
+        self._cond.notify_all()
+
+    def release(self, token):
+        """Finish an analysis started with acquire(), charging its CPU time to the user"""
+        user_id, cpu_start = token
+        cpu = max(0.0, time.thread_time() - cpu_start)
+        with self._cond:
+            self._active[user_id] -= 1
+            if not self._active[user_id]:
+                del self._active[user_id]
+            self._total_active -= 1
+            self._cpu.setdefault(user_id, deque()).append((time.monotonic(), cpu))
+            self._cond.notify_all()
+
+    def snapshot(self, user_id):
+        """Current limit state for a user, for the UI"""
+        with self._cond:
+            return {
+                'running': self._active.get(user_id, 0),
+                'queued': len(self._waiting.get(user_id, ())),
+                'max_concurrent': self.max_concurrent_per_user,
+                'max_queued': self.max_queued_per_user,
+                'cpu_seconds_used': round(self._cpu_used(user_id, time.monotonic()), 2),
+                'cpu_seconds_budget': self.cpu_seconds_per_window,
+                'window_seconds': self.window_seconds,
+                'max_rows': self.max_rows,
+                'max_bytes': self.max_bytes,
+            }
+
+
+governor = ResourceGovernor(
+    MAX_CONCURRENT_PER_USER, MAX_CONCURRENT_TOTAL, CPU_SECONDS_PER_WINDOW, CPU_WINDOW_SECONDS,
+    QUEUE_TIMEOUT_SECONDS, max_rows=MAX_ROWS_PER_ANALYSIS, max_bytes=MAX_BYTES_PER_ANALYSIS,
+    max_queued_per_user=MAX_QUEUED_PER_USER, max_queued_total=MAX_QUEUED_TOTAL,
+)
+
+
+def acquire_analysis_slot():
+    """Wait for the current user's fair-share slot; it is released at request teardown"""
+    if g.get('analysis_token') is None:
+        g.analysis_token = governor.acquire(current_user.id)
+
+
+@app.teardown_request
+def release_analysis_slot(exc=None):
+    token = g.pop('analysis_token', None)
+    if token is not None:
+        governor.release(token)
+
+
+def check_load_budget(user_file):
+    """Refuse to load a file larger than the per-analysis byte budget"""
+    if not governor.max_bytes:
+        return
+    size = user_file.size_bytes
+    if size is None:
+        try:
+            size = os.path.getsize(stored_file_path(user_file))
+        except OSError:
+            return
+    if size > governor.max_bytes:
+        mb = 1024 * 1024
+        raise AnalysisLimitError(
+            f'{user_file.filename} is {size / mb:.1f} MB, above the per-analysis limit of {governor.max_bytes / mb:.0f} MB.')
+
+
+def load_budgeted_dataframe(user_file):
+    """Load at most the per-analysis row budget of a file.
+    Returns (df, notice) where notice explains the cut, or None if nothing was cut.
+    """
+    df = load_user_dataframe(user_file, max_rows=governor.max_rows)
+    if not df.attrs.get('rows_truncated'):
+        return df, None
+    notice = f'Only the first {governor.max_rows:,} rows were analyzed (per-analysis row limit).'
+    return df, notice
+
+
+@app.route('/api/v1/limits', methods=['GET'])
+@login_required
+def api_limits():
+    """Current resource limits and usage for the logged-in user"""
+    return jsonify(governor.snapshot(current_user.id)), 200
+
 # ============================================================================
 # AUTHENTICATION ROUTES
 # ============================================================================
@@ -235,18 +828,35 @@ def upload_file():
     if file.filename == '':
         return "No selected file"
     if file:
-        # Save file to disk
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
-        
-        # Record file in database linked to current user
+        filename = os.path.basename(file.filename)
+        # Stream to the content-addressed blob store (one blob per unique content)
         try:
-            new_file = File(filename=file.filename, user_id=current_user.id)
-            db.session.add(new_file)
-            db.session.commit()
+            content_hash, size = store_upload(file.stream, filename)
         except Exception as e:
-            db.session.rollback()
-            return f"File saved but database error: {str(e)}"
+            return f"Failed to save file: {str(e)}"
+        
+        # Record a new version for the current user unless the content is unchanged.
+        # A concurrent upload of the same filename may take the version number first;
+        # the unique index rejects the duplicate and we retry with the next number.
+        from sqlalchemy.exc import IntegrityError
+        for _attempt in range(5):
+            latest = get_user_file(filename)
+            if latest and latest.content_hash == content_hash:
+                return "File already up to date"
+            try:
+                version = (latest.version or 1) + 1 if latest else 1
+                new_file = File(filename=filename, user_id=current_user.id,
+                                content_hash=content_hash, size_bytes=size, version=version)
+                db.session.add(new_file)
+                db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+            except Exception as e:
+                db.session.rollback()
+                return f"File saved but database error: {str(e)}"
+        else:
+            return "File saved but database error: could not assign a version, please retry"
         
         return "File uploaded successfully"
 
@@ -255,16 +865,16 @@ def upload_file():
 @login_required
 def api_session():
     # Combined endpoint: return both files list and active file for current user
-    # Only return files owned by the current user
-    user_files = File.query.filter_by(user_id=current_user.id).all()
-    files = [f.filename for f in user_files]
-    files.sort()
+    # Only return files owned by the current user (one entry per filename, latest version)
+    latest = latest_versions(File.query.filter_by(user_id=current_user.id).all())
+    files = sorted(latest)
+    versions = {name: f.version or 1 for name, f in latest.items()}
     active = session.get('active_file')
     # Validate that active file belongs to current user
-    if active:
-        if not any(f.filename == active for f in user_files):
-            active = None
-    return jsonify({'files': files, 'active_file': active, 'username': current_user.username}), 200
+    if active and active not in latest:
+        active = None
+    return jsonify({'files': files, 'versions': versions, 'active_file': active, 'username': current_user.username,
+                    'limits': governor.snapshot(current_user.id)}), 200
 
 
 @app.route('/select_file', methods=['POST'])
@@ -284,30 +894,18 @@ def select_file():
         return jsonify({'error': 'Invalid file extension'}), 400
     
     # CRITICAL SECURITY FIX: Verify file belongs to current user
-    user_file = File.query.filter_by(filename=filename, user_id=current_user.id).first()
+    user_file = get_user_file(filename)
     if not user_file:
         return jsonify({'error': 'File not found or access denied'}), 404
     
-    target = os.path.join(UPLOAD_FOLDER, filename)
+    target = stored_file_path(user_file)
     if not os.path.exists(target) or not os.path.isfile(target):
         return jsonify({'error': 'File not found on disk'}), 404
 
     # set session active file
     session['active_file'] = filename
-    # ensure session id
-    sid = session.get('sid')
-    if not sid:
-        sid = uuid.uuid4().hex
-        session['sid'] = sid
-
     # clear any existing cache for this session
-    cache_dir = 'cache'
-    cache_path = os.path.join(cache_dir, f'{sid}.pkl')
-    try:
-        if os.path.exists(cache_path):
-            os.remove(cache_path)
-    except Exception:
-        pass
+    clear_session_cache(get_session_id())
 
     return jsonify({'selected': filename}), 200
 
@@ -323,34 +921,25 @@ def auto_analyze():
         return jsonify({'error': 'filename is required'}), 400
     
     # CRITICAL SECURITY FIX: Verify file belongs to current user
-    user_file = File.query.filter_by(filename=filename, user_id=current_user.id).first()
+    user_file = get_user_file(filename)
     if not user_file:
         return jsonify({'error': 'File not found or access denied'}), 404
     
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    filepath = stored_file_path(user_file)
     if not os.path.exists(filepath):
         return jsonify({'error': 'File not found on disk'}), 404
     
     try:
-        # Read dataframe
-        import io
-        if filepath.lower().endswith(('.csv', '.txt')):
-            with open(filepath, 'rb') as fh:
-                raw = fh.read()
-            try:
-                text = raw.decode('utf-8')
-            except Exception:
-                text = raw.decode('utf-8', errors='replace')
-            df = pd.read_csv(io.StringIO(text))
-        else:
-            try:
-                df = pd.read_excel(filepath)
-            except Exception:
-                with open(filepath, 'rb') as fh:
-                    raw = fh.read()
-                text = raw.decode('utf-8', errors='replace')
-                import io as _io
-                df = pd.read_csv(_io.StringIO(text))
+        acquire_analysis_slot()
+        check_load_budget(user_file)
+    except AnalysisLimitError as e:
+        return jsonify({'error': str(e), 'limits': governor.snapshot(current_user.id)}), 429
+    
+    notice = None
+    
+    def analyze():
+        nonlocal notice
+        df, notice = load_budgeted_dataframe(user_file)
         
         # Analysis 1: Head
         head_html = df.head().to_html(classes='data-table', index=False, border=0)
@@ -378,12 +967,13 @@ def auto_analyze():
             except Exception:
                 histogram_html = "<p>Could not generate histogram.</p>"
         
-        return jsonify({
-            'head': head_html,
-            'describe': describe_html,
-            'histogram': histogram_html,
-            'filename': filename
-        }), 200
+        return {'head': head_html, 'describe': describe_html, 'histogram': histogram_html, 'notice': notice}
+    
+    try:
+        # Same content => same analysis, whoever uploaded it and under whatever name.
+        # The row budget is part of the key because it changes what gets analyzed.
+        result = cached_derived(user_file, f'auto_analyze-rows{governor.max_rows}', analyze)
+        return jsonify(dict(result, filename=filename)), 200
     
     except Exception as e:
         return jsonify({'error': f'Error analyzing file: {str(e)}'}), 500
@@ -404,135 +994,97 @@ def chat():
     # Commands that start with 'plot' for visualization
     plot_commands = lower.startswith('plot ')
     
+    # Multi-file commands: concat / join / diff over several of the user's files
+    # Only when every operand names one of the user's files; anything else
+    # (e.g. "diff between amounts in jan and feb?") falls through to the AI
+    multi_file = parse_multi_file_command(msg) if isinstance(msg, str) else None
+    if multi_file and all(get_user_file(*split_version(os.path.basename(name)))
+                          for name in multi_file['filenames']):
+        result, error, _status = run_multi_file_operation(**multi_file)
+        if error:
+            return jsonify({'response': error}), 200
+        return jsonify(result), 200
+
     if lower in file_commands or lower.startswith('show page') or plot_commands:
+        import pandas as pd  # lazy: already in sys.modules once warm_up() has run
         # CRITICAL SECURITY FIX: Only get files belonging to current user
         user_files = File.query.filter_by(user_id=current_user.id).all()
-        files = [f.filename for f in user_files]
         
-        if not files:
+        if not user_files:
             return jsonify({'response': 'No uploaded data files found. Please upload a file first.'}), 200
         
+        latest_by_name = latest_versions(user_files)
         active = session.get('active_file')
         # Verify active file belongs to current user
-        if active and not any(f.filename == active for f in user_files):
-            active = None
-        
-        if active:
-            latest = active
+        if active and active in latest_by_name:
+            latest_file = latest_by_name[active]
         else:
             # Get most recently uploaded file for current user
             latest_file = max(user_files, key=lambda f: f.upload_date)
-            latest = latest_file.filename
-        latest_path = os.path.join(UPLOAD_FOLDER, latest)
+
+        # Per-user fair-share limits: wait for a slot (queued, not rejected)
+        try:
+            acquire_analysis_slot()
+            if not lower.startswith('show page'):
+                check_load_budget(latest_file)
+        except AnalysisLimitError as e:
+            return jsonify({'response': str(e), 'limits': governor.snapshot(current_user.id)}), 200
+
+        # Pagination command: "show page N" pages the cached dataset without re-reading the file
+        if lower.startswith('show page'):
+            parts = lower.split()
+            try:
+                page_req = int(parts[-1])
+            except Exception:
+                return jsonify({'response': 'Invalid page number.'}), 200
+            cached_page = load_cached_page(get_session_id(), page_req)
+            if cached_page is None:
+                return jsonify({'response': 'No cached dataset found. Run a data command first (e.g. "show all data").'}), 200
+            html, pagination = cached_page
+            return jsonify({'response': html, 'pagination': pagination}), 200
+
         # read dataframe
         df = None
         try:
-            # Robustly read CSV/Excel. For CSVs, decode bytes with utf-8 (replace errors) to avoid decode failures.
-            import io
-            if latest_path.lower().endswith(('.csv', '.txt')):
-                with open(latest_path, 'rb') as fh:
-                    raw = fh.read()
-                try:
-                    text = raw.decode('utf-8')
-                except Exception:
-                    text = raw.decode('utf-8', errors='replace')
-                df = pd.read_csv(io.StringIO(text))
-            else:
-                try:
-                    df = pd.read_excel(latest_path)
-                except Exception:
-                    # fallback to reading as CSV if excel read fails
-                    with open(latest_path, 'rb') as fh:
-                        raw = fh.read()
-                    text = raw.decode('utf-8', errors='replace')
-                    import io as _io
-                    df = pd.read_csv(_io.StringIO(text))
+            df, notice = load_budgeted_dataframe(latest_file)
         except Exception as e:
             return jsonify({'response': f'Failed to read the uploaded file: {str(e)}'}), 200
 
         # produce HTML based on command
         try:
-            page_size = 50
-            # Helper to cache full dataframe for this session
-            cache_dir = 'cache'
-            os.makedirs(cache_dir, exist_ok=True)
-            sid = session.get('sid')
-            if not sid:
-                sid = uuid.uuid4().hex
-                session['sid'] = sid
-
-            def cache_df(df_to_cache):
-                path = os.path.join(cache_dir, f'{sid}.pkl')
-                try:
-                    pd.to_pickle(df_to_cache, path)
-                except Exception:
-                    # best-effort
-                    pass
-
-            def load_cached_df():
-                path = os.path.join(cache_dir, f'{sid}.pkl')
-                if os.path.exists(path):
-                    try:
-                        return pd.read_pickle(path)
-                    except Exception:
-                        return None
-                return None
-
-            def make_page(df_obj, page_num=1, page_size=50):
-                total_rows = int(df_obj.shape[0])
-                total_pages = max(1, math.ceil(total_rows / page_size))
-                page = max(1, min(page_num, total_pages))
-                start = (page - 1) * page_size
-                end = start + page_size
-                sub = df_obj.iloc[start:end]
-                html = sub.to_html(classes='data-table', index=False, border=0)
-                pagination = {'total_pages': total_pages, 'current_page': page, 'page_size': page_size, 'total_rows': total_rows}
-                return html, pagination
-
-            # Pagination command: "show page N"
-            if lower.startswith('show page'):
-                parts = lower.split()
-                try:
-                    page_req = int(parts[-1])
-                except Exception:
-                    return jsonify({'response': 'Invalid page number.'}), 200
-                cached = load_cached_df()
-                if cached is None:
-                    return jsonify({'response': 'No cached dataset found. Run a data command first (e.g. "show all data").'}), 200
-                html, pagination = make_page(cached, page_req, page_size)
-                return jsonify({'response': html, 'pagination': pagination}), 200
+            page_size = PAGE_SIZE
+            sid = get_session_id()
 
             if lower == 'show head':
                 # If dataset is large, cache and return first page
                 if df.shape[0] > page_size:
-                    cache_df(df)
+                    cache_session_df(sid, df)
                     html, pagination = make_page(df, 1, page_size)
-                    return jsonify({'response': html, 'pagination': pagination}), 200
+                    return jsonify({'response': html, 'pagination': pagination, 'notice': notice}), 200
                 else:
                     html = df.head().to_html(classes='data-table', index=False, border=0)
-                    return jsonify({'response': html}), 200
+                    return jsonify({'response': html, 'notice': notice}), 200
             elif lower == 'show shape':
-                import pandas as _pd
-                shape_df = _pd.DataFrame({'rows': [df.shape[0]], 'columns': [df.shape[1]]})
+                shape_df = pd.DataFrame({'rows': [df.shape[0]], 'columns': [df.shape[1]]})
                 html = shape_df.to_html(classes='data-table', index=False, border=0)
-                return jsonify({'response': html}), 200
+                return jsonify({'response': html, 'notice': notice}), 200
             elif lower == 'describe data':
-                html = df.describe(include='all').to_html(classes='data-table', border=0)
-                return jsonify({'response': html}), 200
+                html = cached_derived(latest_file, f'describe_html-rows{governor.max_rows}',
+                                      lambda: df.describe(include='all').to_html(classes='data-table', border=0))
+                return jsonify({'response': html, 'notice': notice}), 200
             elif lower == 'show me the average':
                 numeric = df.select_dtypes(include='number')
                 if numeric.shape[1] == 0:
                     return jsonify({'response': 'No numeric columns found in the latest uploaded file.'}), 200
                 means = numeric.mean().to_dict()
-                import pandas as _pd
-                mean_df = _pd.DataFrame.from_dict(means, orient='index', columns=['mean'])
+                mean_df = pd.DataFrame.from_dict(means, orient='index', columns=['mean'])
                 html = mean_df.to_html(classes='data-table', header=True, border=0)
-                return jsonify({'response': html, 'averages': {str(k): (float(v) if pd.notna(v) else None) for k, v in means.items()}}), 200
+                return jsonify({'response': html, 'averages': {str(k): (float(v) if pd.notna(v) else None) for k, v in means.items()}, 'notice': notice}), 200
             elif lower == 'show all data':
                 # Cache full dataframe and return first page
-                cache_df(df)
+                cache_session_df(sid, df)
                 html, pagination = make_page(df, 1, page_size)
-                return jsonify({'response': html, 'pagination': pagination}), 200
+                return jsonify({'response': html, 'pagination': pagination, 'notice': notice}), 200
             elif lower.startswith('plot '):
                 # Extract column name from "plot column_name"
                 parts = lower.split()
@@ -553,7 +1105,7 @@ def chat():
                         hovermode='x unified'
                     )
                     html_plot = fig.to_html(include_plotlyjs='cdn', div_id='plot_histogram')
-                    return jsonify({'response': html_plot}), 200
+                    return jsonify({'response': html_plot, 'notice': notice}), 200
                 except Exception as e:
                     return jsonify({'response': f'Error creating plot: {str(e)}'}), 200
         except Exception as e:
@@ -586,41 +1138,18 @@ def chat():
             
             data_context = "No data file loaded."
             if user_files:
+                latest_by_name = latest_versions(user_files)
                 active = session.get('active_file')
                 # Verify active file belongs to current user
-                if active and not any(f.filename == active for f in user_files):
-                    active = None
-                
-                if active:
-                    latest = active
+                if active and active in latest_by_name:
+                    latest_file = latest_by_name[active]
                 else:
                     latest_file = max(user_files, key=lambda f: f.upload_date)
-                    latest = latest_file.filename
-                latest_path = os.path.join(UPLOAD_FOLDER, latest)
                 
-                # Read dataframe for context
+                # First 5 rows as context (computed once per file content)
                 try:
-                    import io
-                    if latest_path.lower().endswith(('.csv', '.txt')):
-                        with open(latest_path, 'rb') as fh:
-                            raw = fh.read()
-                        try:
-                            text = raw.decode('utf-8')
-                        except Exception:
-                            text = raw.decode('utf-8', errors='replace')
-                        ai_df = pd.read_csv(io.StringIO(text))
-                    else:
-                        try:
-                            ai_df = pd.read_excel(latest_path)
-                        except Exception:
-                            with open(latest_path, 'rb') as fh:
-                                raw = fh.read()
-                            text = raw.decode('utf-8', errors='replace')
-                            import io as _io
-                            ai_df = pd.read_csv(_io.StringIO(text))
-                    
-                    # Get first 5 rows as context
-                    data_context = ai_df.head().to_string()
+                    data_context = cached_derived(latest_file, 'ai_context',
+                                                  lambda: load_user_dataframe(latest_file, max_rows=5).head().to_string())
                 except Exception:
                     data_context = "Could not load data file for context."
             
@@ -685,6 +1214,315 @@ Please answer this question based on the data provided."""
                 'error': True
             }), 200
 
+# ============================================================================
+# MULTI-FILE OPERATIONS (concat / join / diff)
+# ============================================================================
+
+JOIN_TYPES = ('inner', 'left', 'right', 'outer')
+
+
+def read_columns(filepath):
+    """Return the column names of a CSV/Excel file without loading all rows where possible"""
+    import pandas as pd
+    if filepath.lower().endswith(('.csv', '.txt')):
+        return pd.read_csv(filepath, nrows=0, encoding='utf-8', encoding_errors='replace').columns.tolist()
+    return load_dataframe(filepath).columns.tolist()
+
+
+def iter_dataframe_chunks(filepath, chunksize=None, text_columns=None):
+    """Yield a file as dataframes of at most `chunksize` rows.
+    CSV files are streamed; Excel cannot be read incrementally, so it is loaded
+    once and sliced. Columns in `text_columns` are read as strings (blank cells
+    stay NaN) so values hash and compare the same way across files and chunks.
+    """
+    import pandas as pd
+    chunksize = chunksize or CHUNK_ROWS
+    text_columns = list(text_columns or [])
+    if filepath.lower().endswith(('.csv', '.txt')):
+        reader = pd.read_csv(filepath, chunksize=chunksize, encoding='utf-8', encoding_errors='replace',
+                             dtype={c: str for c in text_columns} or None)
+        for chunk in reader:
+            yield chunk
+        return
+    # Read text columns as strings at load time: converting afterwards would turn an
+    # integer column with blanks (loaded as float) into "1.0", "2.0", ...
+    df = load_dataframe(filepath, dtype={c: str for c in text_columns} or None)
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def _partition_to_disk(filepath, columns, on, workdir, label, partitions, text_columns):
+    """Hash-partition a file on its key columns into `partitions` CSV spill files.
+    Rows with a blank key go to a separate spill file so they are never matched.
+    Every file gets a header so empty partitions still carry the schema.
+    Returns (partition paths, blank-key path).
+    """
+    import pandas as pd
+    paths = [os.path.join(workdir, f'{label}-{i}.csv') for i in range(partitions)]
+    null_path = os.path.join(workdir, f'{label}-nullkeys.csv')
+    for path in paths + [null_path]:
+        pd.DataFrame(columns=columns).to_csv(path, index=False)
+    for chunk in iter_dataframe_chunks(filepath, text_columns=text_columns):
+        blank = chunk[on].isna().any(axis=1)
+        if blank.any():
+            chunk[blank].to_csv(null_path, mode='a', header=False, index=False)
+            chunk = chunk[~blank]
+        buckets = pd.util.hash_pandas_object(chunk[on], index=False).to_numpy() % partitions
+        for bucket, part in chunk.groupby(buckets, sort=False):
+            part.to_csv(paths[bucket], mode='a', header=False, index=False)
+    return paths, null_path
+
+
+def _iter_partition_pairs(left_path, right_path, on, partitions=None):
+    """Grace hash join driver: partition both files on `on`, then yield matching
+    (left, right) partition dataframes one pair at a time.
+    Every column is spilled and read back as text, so a value comes out exactly as
+    written in the source file whichever partition its row lands in (re-inferring
+    types per partition would print the same column as "8" in one and "9.0" in another).
+    DataFrame.merge would pair blank keys with each other, so blank-key rows of
+    each side are yielded last against an empty frame from the other side: they
+    come through as unmatched rows and never pair up.
+    """
+    import pandas as pd
+    import tempfile
+    partitions = partitions or JOIN_PARTITIONS
+    left_cols = read_columns(left_path)
+    right_cols = read_columns(right_path)
+    missing = [k for k in on if k not in left_cols or k not in right_cols]
+    if missing:
+        raise ValueError(f'Key column(s) not found in both files: {", ".join(missing)}')
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=CACHE_FOLDER) as workdir:
+        left_parts, left_nulls = _partition_to_disk(left_path, left_cols, on, workdir, 'left', partitions, left_cols)
+        right_parts, right_nulls = _partition_to_disk(right_path, right_cols, on, workdir, 'right', partitions, right_cols)
+        for lp, rp in zip(left_parts, right_parts):
+            yield pd.read_csv(lp, dtype=str), pd.read_csv(rp, dtype=str)
+        left_blank = pd.read_csv(left_nulls, dtype=str)
+        right_blank = pd.read_csv(right_nulls, dtype=str)
+        yield left_blank, right_blank.iloc[0:0]
+        yield left_blank.iloc[0:0], right_blank
+
+
+def concat_files(paths, labels, out_path):
+    """Stack several files into one CSV, aligning columns by name.
+    A leading `source_file` column records which file each row came from.
+    Returns a summary dict.
+    """
+    import pandas as pd
+    columns = []
+    for path in paths:
+        for col in read_columns(path):
+            if col not in columns:
+                columns.append(col)
+    pd.DataFrame(columns=['source_file'] + columns).to_csv(out_path, index=False)
+    rows = 0
+    for path, label in zip(paths, labels):
+        for chunk in iter_dataframe_chunks(path):
+            chunk = chunk.reindex(columns=columns)
+            chunk.insert(0, 'source_file', label)
+            chunk.to_csv(out_path, mode='a', header=False, index=False)
+            rows += len(chunk)
+    return {'rows': rows, 'columns': len(columns) + 1, 'files': len(paths)}
+
+
+def join_files(left_path, right_path, on, how, out_path, partitions=None):
+    """Join two files on key columns with a partitioned (grace) hash join.
+    Overlapping non-key columns get `_left` / `_right` suffixes. Values are copied
+    as text, exactly as they appear in the files. Returns a summary dict.
+    """
+    if how not in JOIN_TYPES:
+        raise ValueError(f'Unsupported join type "{how}". Use one of: {", ".join(JOIN_TYPES)}')
+    rows = 0
+    columns = 0
+    header = True
+    for left, right in _iter_partition_pairs(left_path, right_path, on, partitions):
+        merged = left.merge(right, on=on, how=how, suffixes=('_left', '_right'))
+        merged.to_csv(out_path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+        rows += len(merged)
+        columns = merged.shape[1]
+    return {'rows': rows, 'columns': columns, 'how': how, 'on': list(on)}
+
+
+def diff_files(old_path, new_path, on, out_path, partitions=None):
+    """Compare two versions of a file row by row, matching rows on key columns.
+    Writes the added, removed and changed rows (with a leading `change` column
+    and `_old` / `_new` value pairs) and returns counts for each kind.
+    All values are compared as text, exactly as they appear in the files.
+    Rows sharing a key are matched one-to-one in file order (the first `1` with the
+    first `1`, ...) rather than every pairing of them.
+    """
+    import pandas as pd
+    old_cols = read_columns(old_path)
+    new_cols = read_columns(new_path)
+    compare_cols = [c for c in old_cols if c in new_cols and c not in on]
+    counts = {'added': 0, 'removed': 0, 'changed': 0, 'unchanged': 0}
+    header = True
+    for old, new in _iter_partition_pairs(old_path, new_path, on, partitions):
+        # A key is always hashed to the same partition, so the ordinal counts its rows file-wide
+        old = old.assign(_occurrence=old.groupby(on, dropna=False, sort=False).cumcount())
+        new = new.assign(_occurrence=new.groupby(on, dropna=False, sort=False).cumcount())
+        merged = old.merge(new, on=list(on) + ['_occurrence'], how='outer', suffixes=('_old', '_new'), indicator=True)
+        merged = merged.drop(columns='_occurrence')
+        both = merged[merged['_merge'] == 'both']
+        differs = pd.Series(False, index=both.index)
+        for col in compare_cols:
+            a, b = both[f'{col}_old'], both[f'{col}_new']
+            differs |= ~(a.eq(b) | (a.isna() & b.isna()))
+        parts = [
+            ('added', merged[merged['_merge'] == 'right_only']),
+            ('removed', merged[merged['_merge'] == 'left_only']),
+            ('changed', both[differs]),
+        ]
+        counts['unchanged'] += int((~differs).sum())
+        out = pd.concat([part.assign(change=kind) for kind, part in parts])
+        for kind, part in parts:
+            counts[kind] += len(part)
+        out = out.drop(columns='_merge')
+        out = out[['change'] + [c for c in out.columns if c != 'change']]
+        out.to_csv(out_path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+    counts['rows'] = counts['added'] + counts['removed'] + counts['changed']
+    counts['on'] = list(on)
+    return counts
+
+
+def parse_key_columns(value):
+    """Accept key columns as a list or a comma-separated string"""
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(',') if v.strip()]
+    return []
+
+
+def parse_multi_file_command(msg):
+    """Parse chat commands for multi-file operations. Returns kwargs for
+    run_multi_file_operation() or None if the message is not one of:
+      concat a.csv, b.csv[, ...]
+      join a.csv and b.csv on id[, other_key] [how left|right|outer|inner]
+      diff old.csv and new.csv [on id]
+    """
+    import re
+    text = msg.strip()
+    m = re.match(r'^concat\s+(.+)$', text, re.IGNORECASE)
+    if m:
+        names = [n.strip() for n in re.split(r',|\s+and\s+', m.group(1)) if n.strip()]
+        return {'operation': 'concat', 'filenames': names}
+    m = re.match(r'^join\s+(.+?)\s+(?:and|with)\s+(.+?)\s+on\s+(.+?)(?:\s+how\s+(\w+))?$', text, re.IGNORECASE)
+    if m:
+        return {'operation': 'join', 'filenames': [m.group(1), m.group(2)],
+                'on': parse_key_columns(m.group(3)), 'how': (m.group(4) or 'inner').lower()}
+    m = re.match(r'^diff\s+(.+?)\s+(?:and|with|vs)\s+(.+?)(?:\s+on\s+(.+))?$', text, re.IGNORECASE)
+    if m:
+        return {'operation': 'diff', 'filenames': [m.group(1), m.group(2)],
+                'on': parse_key_columns(m.group(3) or '')}
+    return None
+
+
+def run_multi_file_operation(operation, filenames, on=None, how='inner'):
+    """Run concat/join/diff over files owned by the current user.
+    The result is written to the session's CSV cache so "show page N" can page
+    through it. Returns (result dict, error message, HTTP status).
+    """
+    import pandas as pd
+    filenames = [os.path.basename(str(f).strip()) for f in (filenames or []) if str(f).strip()]
+    on = parse_key_columns(on)
+    if operation == 'concat' and len(filenames) < 2:
+        return None, 'At least two files are required to concatenate.', 400
+    if operation in ('join', 'diff') and len(filenames) != 2:
+        return None, f'Exactly two files are required to {operation}.', 400
+    if operation == 'join' and not on:
+        return None, 'Key column(s) are required to join, e.g. "join a.csv and b.csv on id".', 400
+
+    # CRITICAL SECURITY FIX: only operate on files belonging to current user
+    user_files, paths = [], []
+    for name in filenames:
+        # "name@vN" selects an older version, e.g. "diff budget.csv@v1 vs budget.csv"
+        user_file = get_user_file(*split_version(name))
+        path = stored_file_path(user_file) if user_file else None
+        if not path or not os.path.isfile(path):
+            return None, f'File not found or access denied: {name}', 404
+        user_files.append(user_file)
+        paths.append(path)
+
+    # Streaming keeps memory bounded, but the work still counts against the user's limits.
+    # Excel operands are loaded whole, so every operand is held to the byte budget.
+    try:
+        acquire_analysis_slot()
+        for user_file in user_files:
+            check_load_budget(user_file)
+    except AnalysisLimitError as e:
+        return None, str(e), 429
+
+    sid = get_session_id()
+    clear_session_cache(sid)
+    session.pop('result_rows', None)
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    out_path = os.path.join(CACHE_FOLDER, f'{sid}.csv')
+    try:
+        if operation == 'concat':
+            summary = concat_files(paths, filenames, out_path)
+        elif operation == 'join':
+            summary = join_files(paths[0], paths[1], on, how, out_path)
+        elif operation == 'diff':
+            if not on:
+                # No key given: match whole rows on the columns both versions share
+                new_cols = read_columns(paths[1])
+                on = [c for c in read_columns(paths[0]) if c in new_cols]
+                if not on:
+                    return None, 'The two files share no columns to compare.', 400
+            summary = diff_files(paths[0], paths[1], on, out_path)
+        else:
+            return None, f'Unknown operation: {operation}', 400
+    except ValueError as e:
+        clear_session_cache(sid)
+        return None, str(e), 400
+    except Exception as e:
+        clear_session_cache(sid)
+        return None, f'Error running {operation}: {str(e)}', 500
+
+    session['result_rows'] = summary['rows']
+    html, pagination = make_page(pd.read_csv(out_path, nrows=PAGE_SIZE), 1, PAGE_SIZE, total_rows=summary['rows'])
+    summary.update({'operation': operation, 'filenames': filenames})
+    return {'response': html, 'pagination': pagination, 'summary': summary}, None, 200
+
+
+@app.route('/api/v1/files/concat', methods=['POST'])
+@login_required
+def api_concat_files():
+    """Concatenate several of the user's files: {"filenames": [...]}"""
+    data = request.get_json(silent=True) or {}
+    result, error, status = run_multi_file_operation('concat', data.get('filenames'))
+    if error:
+        return jsonify({'error': error}), status
+    return jsonify(result), status
+
+
+@app.route('/api/v1/files/join', methods=['POST'])
+@login_required
+def api_join_files():
+    """Join two of the user's files: {"left", "right", "on", "how"}"""
+    data = request.get_json(silent=True) or {}
+    how = str(data.get('how') or 'inner').strip().lower()
+    result, error, status = run_multi_file_operation(
+        'join', [data.get('left', ''), data.get('right', '')], on=data.get('on'), how=how)
+    if error:
+        return jsonify({'error': error}), status
+    return jsonify(result), status
+
+
+@app.route('/api/v1/files/diff', methods=['POST'])
+@login_required
+def api_diff_files():
+    """Diff two versions of a file: {"old", "new", "on"} (on is optional)"""
+    data = request.get_json(silent=True) or {}
+    result, error, status = run_multi_file_operation(
+        'diff', [data.get('old', ''), data.get('new', '')], on=data.get('on'))
+    if error:
+        return jsonify({'error': error}), status
+    return jsonify(result), status
+
 # ============================================================================
 # DASHBOARD API ENDPOINTS
 # ============================================================================
@@ -733,7 +1571,6 @@ def add_chart_to_dashboard(dashboard_id):
         return jsonify({'error': 'Chart type is required'}), 400
     
     try:
-        import json
         # Create new chart
         chart = Chart(
             chart_type=chart_type,
@@ -756,8 +1593,7 @@ def add_chart_to_dashboard(dashboard_id):
 
 if __name__ == '__main__':
     # Initialize the database
-    with app.app_context():
-        db.create_all()
-        print("Database initialized successfully.")
+    init_db()
+    print("Database initialized successfully.")
     
     app.run(debug=True, use_reloader=False)
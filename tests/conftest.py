@@ -0,0 +1,40 @@
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+# main.py reads DATABASE_URL and creates uploads/ at import time, so point both
+# at a throwaway directory before it is imported by any test.
+_TMP = tempfile.mkdtemp(prefix='analyst-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(_TMP, "test.db")}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_cwd = os.getcwd()
+os.chdir(_TMP)
+import main  # noqa: E402
+os.chdir(_cwd)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory so uploads/ and cache/ are per test"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def client(workdir):
+    """A logged-in test client on a fresh database"""
+    with main.app.app_context():
+        main.db.drop_all()
+    main.init_db()
+    c = main.app.test_client()
+    c.post('/register', data={'username': 'analyst', 'password': 'secret1', 'password_confirm': 'secret1'})
+    c.post('/login', data={'username': 'analyst', 'password': 'secret1'})
+    return c
+
+
+def upload(client, filename, content):
+    data = content.encode() if isinstance(content, str) else content
+    return client.post('/upload', data={'file': (io.BytesIO(data), filename)}, content_type='multipart/form-data')
@@ -0,0 +1,56 @@
+import glob
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import main
+from conftest import upload
+
+
+def test_requests_beyond_the_queue_cap_are_rejected_at_once():
+    gv = main.ResourceGovernor(1, 4, 100, 60, 5, max_queued_per_user=1, max_queued_total=4)
+    token = gv.acquire('heavy')
+    waiter = threading.Thread(target=lambda: gv.release(gv.acquire('heavy')))
+    waiter.start()
+    time.sleep(0.1)
+    start = time.monotonic()
+    with pytest.raises(main.AnalysisLimitError):
+        gv.acquire('heavy')
+    assert time.monotonic() - start < 0.5
+    # Other users are not blocked by the heavy user's queue
+    gv.release(gv.acquire('light'))
+    gv.release(token)
+    waiter.join()
+
+
+def test_spent_cpu_budget_fails_fast():
+    gv = main.ResourceGovernor(2, 4, 0.001, 60, 5)
+    token = gv.acquire('u')
+    sum(range(10 ** 6))
+    gv.release(token)
+    start = time.monotonic()
+    with pytest.raises(main.AnalysisLimitError, match='CPU time'):
+        gv.acquire('u')
+    assert time.monotonic() - start < 0.5
+
+
+def test_row_budget_limits_rows_read_and_cached(client, monkeypatch):
+    monkeypatch.setattr(main.governor, 'max_rows', 3)
+    upload(client, 'big.csv', 'id\n' + '\n'.join(str(i) for i in range(10)) + '\n')
+    data = client.post('/chat', json={'message': 'show shape'}).get_json()
+    assert '<td>3</td>' in data['response']
+    assert 'first 3 rows' in data['notice']
+    frames = [pd.read_pickle(p) for p in glob.glob(os.path.join(main.FRAME_CACHE_FOLDER, '*.pkl'))]
+    assert [len(f) for f in frames] == [3]
+
+
+def test_multi_file_operations_respect_the_byte_budget(client, monkeypatch):
+    upload(client, 'a.csv', 'id,v\n1,x\n')
+    upload(client, 'big.csv', 'id,v\n' + ''.join(f'{i},y\n' for i in range(100)))
+    monkeypatch.setattr(main.governor, 'max_bytes', 100)
+    resp = client.post('/api/v1/files/join', json={'left': 'a.csv', 'right': 'big.csv', 'on': 'id'})
+    assert resp.status_code == 429
+    assert 'big.csv' in resp.get_json()['error']
@@ -0,0 +1,75 @@
+import pandas as pd
+
+import main
+
+
+def write_csv(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_join_csv_with_xlsx_matches_integer_keys(workdir):
+    # An Excel integer column with a blank cell loads as float; keys must still match "1", "2"
+    left = write_csv(workdir / 'a.csv', 'id,a\n1,x\n2,y\n3,z\n,blank\n')
+    right = str(workdir / 'c.xlsx')
+    pd.DataFrame({'id': [1, 2, None], 'c': ['p', 'q', 'r']}).to_excel(right, index=False)
+    out = str(workdir / 'out.csv')
+
+    summary = main.join_files(left, right, ['id'], 'inner', out, partitions=4)
+
+    result = pd.read_csv(out, dtype={'id': str}).sort_values('id')
+    assert summary['rows'] == 2
+    assert result['id'].tolist() == ['1', '2']
+    assert result['c'].tolist() == ['p', 'q']
+
+
+def test_blank_keys_never_pair_up(workdir):
+    left = write_csv(workdir / 'a.csv', 'id,v\n1,x\n,left-blank\n')
+    right = write_csv(workdir / 'b.csv', 'id,v\n1,x\n,right-blank\n')
+    out = str(workdir / 'out.csv')
+
+    summary = main.join_files(left, right, ['id'], 'left', out, partitions=2)
+    result = pd.read_csv(out)
+    assert summary['rows'] == 2
+    blank = result[result['id'].isna()]
+    assert blank['v_left'].tolist() == ['left-blank']
+    assert blank['v_right'].isna().all()
+
+    counts = main.diff_files(left, right, ['id'], out, partitions=2)
+    assert (counts['added'], counts['removed'], counts['changed'], counts['unchanged']) == (1, 1, 0, 1)
+
+
+def test_chat_question_starting_with_diff_goes_to_ai(client, monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    data = client.post('/chat', json={'message': 'diff between amounts in jan and feb?'}).get_json()
+    assert 'AI feature not configured' in data['answer']
+
+
+def test_join_across_partitions_keeps_value_formatting(workdir):
+    left = write_csv(workdir / 'a.csv', 'id,a,n\n' + ''.join(f'{i},a{i},{i * 10}\n' for i in range(1, 21)))
+    # Blank `m` cells would make a per-partition type guess print some integers as "9.0"
+    right = write_csv(workdir / 'b.csv', 'id,b,m\n' + ''.join(
+        f'{i},b{i},{"" if i % 3 == 0 else i}\n' for i in range(1, 21)))
+    out = str(workdir / 'out.csv')
+
+    summary = main.join_files(left, right, ['id'], 'outer', out, partitions=3)
+
+    assert summary['rows'] == 20
+    lines = open(out, encoding='utf-8').read().splitlines()[1:]
+    rows = {line.split(',')[0]: line for line in lines}
+    assert rows['1'] == '1,a1,10,b1,1'
+    assert rows['3'] == '3,a3,30,b3,'
+    assert rows['20'] == '20,a20,200,b20,20'
+    assert not any('.0' in line for line in lines)
+
+
+def test_diff_matches_repeated_keys_one_to_one(workdir):
+    same = write_csv(workdir / 'a.csv', 'id,x\n1,a\n1,a\n')
+    out = str(workdir / 'out.csv')
+    counts = main.diff_files(same, same, ['id'], out, partitions=2)
+    assert (counts['added'], counts['removed'], counts['changed'], counts['unchanged']) == (0, 0, 0, 2)
+
+    new = write_csv(workdir / 'b.csv', 'id,x\n1,a\n1,b\n1,c\n')
+    counts = main.diff_files(same, new, ['id'], out, partitions=2)
+    assert (counts['added'], counts['removed'], counts['changed'], counts['unchanged']) == (1, 0, 1, 1)
+    assert '_occurrence' not in pd.read_csv(out).columns
@@ -0,0 +1,102 @@
+import hashlib
+import os
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import main
+from conftest import upload
+
+
+def shape_of(client, filename):
+    client.post('/select_file', json={'filename': filename})
+    return client.post('/chat', json={'message': 'show shape'}).get_json()['response']
+
+
+def test_users_uploading_the_same_filename_do_not_overwrite_each_other(client):
+    other = main.app.test_client()
+    other.post('/register', data={'username': 'other', 'password': 'secret2', 'password_confirm': 'secret2'})
+    other.post('/login', data={'username': 'other', 'password': 'secret2'})
+    assert upload(client, 'test_data.csv', 'id\n1\n').data == b'File uploaded successfully'
+    assert upload(other, 'test_data.csv', 'id\n1\n2\n3\n').data == b'File uploaded successfully'
+    assert '<td>1</td>' in shape_of(client, 'test_data.csv')
+    assert '<td>3</td>' in shape_of(other, 'test_data.csv')
+    with main.app.app_context():
+        paths = {main.stored_file_path(f) for f in main.File.query.filter_by(filename='test_data.csv')}
+    assert len(paths) == 2
+
+
+def test_identical_reupload_is_a_no_op_and_reuses_the_blob(client):
+    content = 'id,amt\n1,10\n'
+    upload(client, 'budget.csv', content)
+    assert upload(client, 'budget.csv', content).data == b'File already up to date'
+    # The same bytes under another name share the existing blob
+    upload(client, 'copy.csv', content)
+    assert os.listdir(main.BLOB_FOLDER) == [hashlib.sha256(content.encode()).hexdigest() + '.csv']
+    with main.app.app_context():
+        assert main.File.query.filter_by(filename='budget.csv').count() == 1
+        assert main.File.query.count() == 2
+
+
+def test_versioned_name_selects_that_version(client):
+    upload(client, 'budget.csv', 'id,amt\n1,10\n2,20\n')
+    upload(client, 'budget.csv', 'id,amt\n1,10\n2,25\n')
+    data = client.post('/api/v1/files/diff', json={'old': 'budget.csv@v1', 'new': 'budget.csv', 'on': 'id'}).get_json()
+    assert (data['summary']['changed'], data['summary']['unchanged']) == (1, 1)
+    with main.app.app_context():
+        user_id = main.File.query.first().user_id
+        v1 = main.get_user_file(*main.split_version('budget.csv@v1'), user_id=user_id)
+        latest = main.get_user_file(*main.split_version('budget.csv'), user_id=user_id)
+    assert (v1.version, latest.version) == (1, 2)
+    assert v1.content_hash != latest.content_hash
+
+
+def test_legacy_rows_without_a_hash_resolve_to_uploads_folder(client):
+    os.makedirs(main.UPLOAD_FOLDER, exist_ok=True)
+    with open(os.path.join(main.UPLOAD_FOLDER, 'legacy.csv'), 'w', encoding='utf-8') as fh:
+        fh.write('id\n1\n2\n')
+    with main.app.app_context():
+        user = main.User.query.filter_by(username='analyst').one()
+        main.db.session.add(main.File(filename='legacy.csv', user_id=user.id))
+        main.db.session.commit()
+        legacy = main.get_user_file('legacy.csv', 1, user_id=user.id)
+        assert main.stored_file_path(legacy) == os.path.join('uploads', 'legacy.csv')
+    assert '<td>2</td>' in shape_of(client, 'legacy.csv')
+
+
+def test_version_numbers_are_unique(client):
+    upload(client, 'budget.csv', 'id,amt\n1,10\n')
+    with main.app.app_context():
+        first = main.File.query.filter_by(filename='budget.csv').one()
+        main.db.session.add(main.File(filename='budget.csv', user_id=first.user_id,
+                                      content_hash='0' * 64, version=first.version))
+        with pytest.raises(IntegrityError):
+            main.db.session.commit()
+        main.db.session.rollback()
+
+
+def test_upload_retries_when_a_concurrent_upload_took_the_version(client, monkeypatch):
+    upload(client, 'budget.csv', 'id,amt\n1,10\n')
+    real_get_user_file = main.get_user_file
+    calls = []
+
+    def stale_then_real(*args, **kwargs):
+        # First lookup misses the version another request just committed
+        calls.append(args)
+        return None if len(calls) == 1 else real_get_user_file(*args, **kwargs)
+
+    monkeypatch.setattr(main, 'get_user_file', stale_then_real)
+    assert upload(client, 'budget.csv', 'id,amt\n1,20\n').data == b'File uploaded successfully'
+    with main.app.app_context():
+        versions = sorted(f.version for f in main.File.query.filter_by(filename='budget.csv'))
+    assert versions == [1, 2]
+
+
+def test_content_caches_are_keyed_by_extension(client):
+    content = 'id,amt\n1,10\n2,20\n'
+    upload(client, 'x.csv', content)
+    upload(client, 'x.txt', content)
+    for name in ('x.csv', 'x.txt'):
+        assert client.post('/api/v1/auto_analyze', json={'filename': name}).status_code == 200
+    assert len(os.listdir(main.FRAME_CACHE_FOLDER)) == 2
+    assert len(os.listdir(main.DERIVED_CACHE_FOLDER)) == 2